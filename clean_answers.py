@@ -3,11 +3,62 @@
 Clean and deduplicate answers from the ultimate scraper output
 Properly separate questions from answers
 """
+import hashlib
 import json
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
 from datetime import datetime
 
+# Precompiled patterns (compiling per call wastes CPU when cleaning
+# thousands of answer blocks)
+_NAV_RE = re.compile(r'^Skip to content.*?Most recent', re.DOTALL)
+_FOLLOWERS_RE = re.compile(r'^\d+ followers.*?More')
+# Generic pattern for Quora author metadata: Name + Credential + Date
+# Matches patterns like: "John Smith [credentials]·[date]·"
+# where date can be "5y", "3mo", "Jan 15", etc.
+_AUTHOR_RE = re.compile(r'[A-Z][^·]{5,50}·(?:\d+[ymo]|[A-Z][a-z]{2} \d+)·?', re.IGNORECASE)
+_WS_RE = re.compile(r'\s+')
+
+# Optional linear-time backend: google-re2 compiles these patterns to a
+# DFA, so each block is scanned in a single pass with no backtracking.
+# The stdlib objects above stay as the portable fallback; they expose
+# the same .sub/.finditer interface, so call sites don't care which
+# engine is active.
+try:
+    import re2 as _re2
+
+    # google-re2 exposes no flag constants (compile takes an Options
+    # object), so spell the flags inline. Build all three before
+    # rebinding anything, so a failure leaves the stdlib objects intact.
+    _NAV_RE, _FOLLOWERS_RE, _AUTHOR_RE = (
+        _re2.compile('(?s)' + _NAV_RE.pattern),
+        _re2.compile(_FOLLOWERS_RE.pattern),
+        _re2.compile('(?i)' + _AUTHOR_RE.pattern),
+    )
+except ImportError:
+    _re2 = None
+except Exception:
+    # An optional backend must never break import; keep stdlib re
+    _re2 = None
+
+# Optional streaming JSON parser: lets the cleaning loop start before
+# the whole input file is parsed and caps peak memory at one cleaning
+# batch of answers instead of bytes + full parse tree.
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Optional fast JSON codec: orjson encodes/decodes in C and is several
+# times faster than the stdlib pretty-printer on multi-MB answer files.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 def clean_answer_block(text, author_pattern=None):
     """
@@ -20,20 +71,23 @@ def clean_answer_block(text, author_pattern=None):
         author_pattern: Optional regex pattern to match author metadata.
                        If None, uses a generic pattern that matches most Quora authors.
     """
-    # Remove leading navigation/UI text
-    text = re.sub(r'^Skip to content.*?Most recent', '', text, flags=re.DOTALL)
-    text = re.sub(r'^\d+ followers.*?More', '', text)
-
-    # Generic pattern for Quora author metadata: Name + Credential + Date
-    # Matches patterns like: "John Smith [credentials]·[date]·"
+    # Remove leading navigation/UI text. Both patterns anchor at the
+    # start and almost never match, so cheap prefix checks skip the
+    # regex engine entirely on the common case
+    if text.startswith('Skip to content'):
+        text = _NAV_RE.sub('', text)
+    if text[:1].isdigit() and ' followers' in text[:64]:
+        text = _FOLLOWERS_RE.sub('', text)
+
+    # Use the precompiled generic author pattern unless a custom one is given
     # This works for most Quora answer formats regardless of author name
     if author_pattern is None:
-        # Generic pattern: looks for [text]·[date]· structure
-        # where date can be "5y", "3mo", "Jan 15", etc.
-        author_pattern = r'[A-Z][^·]{5,50}·(?:\d+[ymo]|[A-Z][a-z]{2} \d+)·?'
+        author_pattern = _AUTHOR_RE
+    else:
+        author_pattern = re.compile(author_pattern, re.IGNORECASE)
 
     # Find all occurrences
-    matches = list(re.finditer(author_pattern, text, re.IGNORECASE))
+    matches = list(author_pattern.finditer(text))
 
     if not matches:
         # No author metadata found, use last question mark strategy
@@ -49,22 +103,27 @@ def clean_answer_block(text, author_pattern=None):
         return None, None
 
     # Strategy: Find the LAST occurrence of author metadata before a question
-    # The text after that is the actual Q&A content
-    last_match = matches[-1]
-    content_after_metadata = text[last_match.end():].strip()
+    # The text after that is the actual Q&A content. Track it as integer
+    # offsets into text so no intermediate copy is allocated.
+    start = matches[-1].end()
+    end = len(text)
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
 
     # Find the LAST question mark - everything before is question, after is answer
     # This handles cases where there are multiple questions in the question text
-    last_question_mark_pos = content_after_metadata.rfind('?')
+    last_question_mark_pos = text.rfind('?', start, end)
 
     if last_question_mark_pos != -1:
         # Everything up to and including the last ? is the question
-        question = content_after_metadata[:last_question_mark_pos + 1].strip()
+        question = text[start:last_question_mark_pos + 1].strip()
         # Everything after the last ? is the answer
-        answer = content_after_metadata[last_question_mark_pos + 1:].strip()
+        answer = text[last_question_mark_pos + 1:end].strip()
 
         # Remove any remaining author metadata patterns from answer
-        answer = re.sub(author_pattern, '', answer, flags=re.IGNORECASE).strip()
+        answer = author_pattern.sub('', answer).strip()
 
         # Validate: question and answer should be different and substantial
         # Lowered answer threshold to 10 chars to capture concise but valid answers
@@ -82,14 +141,22 @@ def deduplicate_answers(answers):
     unique_answers = []
 
     for ans in answers:
-        question = ans.get('question', '')
-
-        # Create a normalized version for comparison
-        normalized = re.sub(r'\s+', ' ', question.lower().strip())
+        # Use the normalized key cached at cleaning time when present
+        # (and drop it so it never reaches the output), otherwise
+        # normalize here
+        normalized = ans.pop('_norm', None)
+        if normalized is None:
+            question = ans.get('question', '')
+            normalized = _WS_RE.sub(' ', question.lower().strip())
+
+        # Key the set on a 128-bit digest instead of the full question:
+        # membership checks compare 16 fixed bytes and the set no longer
+        # retains every normalized string
+        key = hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
 
         # Only keep if we haven't seen this question before
-        if normalized not in seen_questions and len(normalized) > 20:
-            seen_questions.add(normalized)
+        if key not in seen_questions and len(normalized) > 20:
+            seen_questions.add(key)
             unique_answers.append(ans)
 
     return unique_answers
@@ -108,12 +175,20 @@ def split_multiple_qa_blocks(text, author_pattern=None):
     Returns:
         List of text blocks, each containing a single Q&A
     """
-    # Generic pattern for Quora author metadata
+    # The generic author metadata always contains a '·' separator, so
+    # fewer than two of them means at most one match: skip the regex
+    # scan entirely (str.count is a tight C loop)
+    if author_pattern is None and text.count('·') < 2:
+        return [text]
+
+    # Use the precompiled generic author pattern unless a custom one is given
     if author_pattern is None:
-        author_pattern = r'[A-Z][^·]{5,50}·(?:\d+[ymo]|[A-Z][a-z]{2} \d+)·?'
+        author_pattern = _AUTHOR_RE
+    else:
+        author_pattern = re.compile(author_pattern, re.IGNORECASE)
 
     # Find all author metadata occurrences
-    matches = list(re.finditer(author_pattern, text, re.IGNORECASE))
+    matches = list(author_pattern.finditer(text))
 
     # If only 0 or 1 match, return as single block
     if len(matches) <= 1:
@@ -138,60 +213,223 @@ def split_multiple_qa_blocks(text, author_pattern=None):
     return blocks
 
 
-def clean_ultimate_output(input_file, output_dir):
+def _iter_qa_segments(text):
+    """
+    Scan a raw extraction once and yield its Q&A segments.
+
+    This fuses split_multiple_qa_blocks + clean_answer_block: one
+    _AUTHOR_RE.finditer pass computes all block boundaries, so each
+    block is not re-scanned for the author metadata it starts with.
+
+    Yields:
+        (text, content_start, content_end) tuples, where text is the
+        nav-stripped string to slice and [content_start:content_end)
+        is the Q&A content with author metadata already excluded.
+    """
+    # Remove leading navigation/UI text once for the whole raw entry,
+    # with the same cheap prefix guards as clean_answer_block
+    if text.startswith('Skip to content'):
+        text = _NAV_RE.sub('', text)
+    if text[:1].isdigit() and ' followers' in text[:64]:
+        text = _FOLLOWERS_RE.sub('', text)
+
+    # Author metadata always contains a '·' separator: with none in the
+    # text there can be no match, so skip the regex scan and go straight
+    # to the fallback segment
+    if '·' not in text:
+        yield text, 0, len(text)
+        return
+
+    matches = list(_AUTHOR_RE.finditer(text))
+
+    if not matches:
+        # No author metadata found, caller falls back to the
+        # last-question-mark strategy on the whole text
+        yield text, 0, len(text)
+        return
+
+    if len(matches) == 1:
+        # Single block: content is everything after the author metadata
+        yield text, matches[0].end(), len(text)
+        return
+
+    # Multiple blocks: each runs from one author match to the next,
+    # content starts after the matched metadata
+    for i, match in enumerate(matches):
+        if i + 1 < len(matches):
+            block_end = matches[i + 1].start()
+        else:
+            block_end = len(text)
+
+        # Only keep substantial blocks
+        if len(text[match.start():block_end].strip()) > 50:
+            yield text, match.end(), block_end
+
+
+def _write_txt(path, parts):
+    """
+    Flush a list of text chunks to path in one scatter-gather syscall
+    (os.writev) where the platform has it, instead of copying the
+    chunks through a joined string and the stdio buffer. Falls back to
+    a plain buffered write elsewhere (e.g. Windows).
+    """
+    chunks = [part.encode('utf-8') for part in parts]
+
+    if hasattr(os, 'writev'):
+        fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            # writev caps the buffer count at IOV_MAX (typically 1024)
+            # and, like write, may flush fewer bytes than asked: advance
+            # by the returned count until every chunk is on disk
+            idx = 0       # next chunk to flush
+            offset = 0    # bytes of chunks[idx] already flushed
+            while idx < len(chunks):
+                batch = chunks[idx:idx + 1024]
+                if offset:
+                    batch[0] = batch[0][offset:]
+                written = os.writev(fd, batch)
+                if written <= 0:
+                    raise OSError(f'writev returned {written} writing {path}')
+                written += offset
+                while idx < len(chunks) and written >= len(chunks[idx]):
+                    written -= len(chunks[idx])
+                    idx += 1
+                offset = written
+        finally:
+            os.close(fd)
+    else:
+        with open(path, 'wb') as f:
+            f.writelines(chunks)
+
+
+def _read_input(input_file):
+    """
+    Return (profile, scraping_stats, answers) for a raw scraper JSON file.
+
+    With ijson installed the answers are streamed one at a time; the two
+    small metadata objects come before the answers array in the scraper
+    output, so those passes stop parsing early. Falls back to a plain
+    json.load when ijson is not available.
+    """
+    if ijson is not None:
+        with open(input_file, 'rb') as f:
+            profile = next(ijson.items(f, 'profile'), {})
+        with open(input_file, 'rb') as f:
+            scraping_stats = next(ijson.items(f, 'scraping_stats'), {})
+
+        def stream_answers():
+            with open(input_file, 'rb') as f:
+                yield from ijson.items(f, 'answers.item')
+
+        return profile, scraping_stats, stream_answers()
+
+    if orjson is not None:
+        with open(input_file, 'rb') as f:
+            data = orjson.loads(f.read())
+    else:
+        with open(input_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+    return data.get('profile', {}), data.get('scraping_stats', {}), data.get('answers', [])
+
+
+def _process_raw(ans):
+    """
+    Clean one raw extraction into zero or more answer dicts.
+
+    Module-level so ProcessPoolExecutor can ship it to workers; the
+    compiled patterns are module globals, recreated on worker import.
+
+    Returns:
+        (cleaned, skipped, was_split) tuple.
+    """
+    question_raw = ans.get('question', '')
+
+    # One regex pass computes all block boundaries up front
+    segments = list(_iter_qa_segments(question_raw))
+
+    cleaned = []
+    skipped = 0
+
+    # Process each segment separately
+    for text, content_start, content_end in segments:
+        content = text[content_start:content_end].strip()
+
+        # Find the LAST question mark - everything before is question,
+        # after is answer
+        last_q_pos = content.rfind('?')
+        if last_q_pos == -1:
+            skipped += 1
+            continue
+
+        question = content[:last_q_pos + 1].strip()
+        answer = content[last_q_pos + 1:].strip()
+
+        # Only keep if both question and answer have substance and are different
+        # Lowered answer threshold to 10 chars to capture concise but valid answers
+        if (question and answer and
+            len(question) > 20 and len(answer) > 10 and
+            question != answer):
+            cleaned.append({
+                'question': question,
+                'answer': answer,
+                'extracted_at': ans.get('extracted_at', datetime.now().isoformat()),
+                # Dedup key, computed while the question string is
+                # hot; deduplicate_answers pops it back out
+                '_norm': _WS_RE.sub(' ', question.lower().strip())
+            })
+        else:
+            skipped += 1
+
+    return cleaned, skipped, len(segments) > 1
+
+
+def clean_ultimate_output(input_file, output_dir, jobs=None):
     """
     Clean the ultimate scraper output.
+
+    Args:
+        input_file: Path to the ultimate scraper JSON file
+        output_dir: Directory for the cleaned JSON/TXT files
+        jobs: Worker process count for the cleaning stage
+              (None = one per CPU core)
     """
     print(f"📂 Reading: {input_file}")
 
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    original_count = len(data['answers'])
-    print(f"📊 Original answers: {original_count}")
+    profile, scraping_stats, answers = _read_input(input_file)
 
-    # Clean each answer
+    # Clean each answer. The per-entry work is pure CPU (regex + string
+    # ops), so fan it out over processes; dedup stays single-threaded
+    # since it needs one shared seen-set.
     cleaned_answers = []
+    original_count = 0
     skipped = 0
     split_count = 0
 
-    for i, ans in enumerate(data['answers']):
-        question_raw = ans.get('question', '')
-        answer_raw = ans.get('answer', '')
+    # Submit in bounded batches: Executor.map drains its whole input
+    # into pending tasks up front, which would materialize a streamed
+    # (ijson) input; one batch at a time keeps in-flight memory capped.
+    answers = iter(answers)
 
-        # First, split if there are multiple Q&A blocks in the raw text
-        blocks = split_multiple_qa_blocks(question_raw)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while True:
+            batch = list(islice(answers, 1024))
+            if not batch:
+                break
 
-        # Count how many raw entries got split
-        if len(blocks) > 1:
-            split_count += 1
+            for cleaned, n_skipped, was_split in pool.map(_process_raw, batch, chunksize=64):
+                original_count += 1
+                cleaned_answers.extend(cleaned)
+                skipped += n_skipped
 
-        # Process each block separately
-        for block in blocks:
-            # Always try to clean the block to separate question from answer
-            question, answer = clean_answer_block(block)
+                # Count how many raw entries got split
+                if was_split:
+                    split_count += 1
 
-            # Skip if cleaning failed
-            if question is None or answer is None:
-                skipped += 1
-                continue
-
-            # Only keep if both question and answer have substance and are different
-            # Lowered answer threshold to 10 chars to capture concise but valid answers
-            if (question and answer and
-                len(question) > 20 and len(answer) > 10 and
-                question != answer):
-                cleaned_answers.append({
-                    'question': question,
-                    'answer': answer,
-                    'extracted_at': ans.get('extracted_at', datetime.now().isoformat())
-                })
-            else:
-                skipped += 1
-
-        if (i + 1) % 100 == 0:
-            print(f"   Processed {i + 1}/{original_count} ({skipped} skipped, {split_count} split)...")
+                if original_count % 100 == 0:
+                    print(f"   Processed {original_count} ({skipped} skipped, {split_count} split)...")
 
+    print(f"📊 Original answers: {original_count}")
     print(f"✅ Cleaned: {len(cleaned_answers)} answers")
 
     # Deduplicate
@@ -200,9 +438,9 @@ def clean_ultimate_output(input_file, output_dir):
 
     # Prepare output
     result = {
-        'profile': data.get('profile', {}),
+        'profile': profile,
         'scraping_stats': {
-            **data.get('scraping_stats', {}),
+            **scraping_stats,
             'original_extractions': original_count,
             'after_cleaning': len(cleaned_answers),
             'after_deduplication': len(unique_answers)
@@ -214,30 +452,41 @@ def clean_ultimate_output(input_file, output_dir):
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
 
-    user_id = data['profile'].get('user_id', 'unknown')
+    user_id = profile.get('user_id', 'unknown')
     json_file = output_path / f"{user_id}_cleaned.json"
 
-    with open(json_file, 'w', encoding='utf-8') as f:
-        json.dump(result, f, indent=2, ensure_ascii=False)
+    if orjson is not None:
+        # orjson emits UTF-8 bytes and never escapes non-ASCII, so the
+        # on-disk format matches the stdlib ensure_ascii=False output
+        with open(json_file, 'wb') as f:
+            f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2))
+    else:
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
 
     print(f"💾 Saved: {json_file}")
 
-    # Save cleaned TXT
+    # Save cleaned TXT (assemble chunks in memory, flush in one go)
     txt_file = output_path / f"{user_id}_cleaned.txt"
-    with open(txt_file, 'w', encoding='utf-8') as f:
-        f.write(f"QUORA PROFILE: {user_id}\n")
-        f.write(f"{'=' * 100}\n\n")
-        f.write(f"URL: {data['profile'].get('url', 'N/A')}\n")
-        f.write(f"Claimed answers: {data['profile'].get('nb_answers_claimed', 'N/A')}\n")
-        f.write(f"Unique answers extracted: {len(unique_answers)}\n")
-        f.write(f"\n{'=' * 100}\n\n")
-
-        for i, ans in enumerate(unique_answers, 1):
-            f.write(f"\n{'=' * 100}\n")
-            f.write(f"ANSWER #{i}\n")
-            f.write(f"{'=' * 100}\n")
-            f.write(f"\n❓ QUESTION:\n{ans['question']}\n")
-            f.write(f"\n💬 ANSWER:\n{ans['answer']}\n")
+    parts = [
+        f"QUORA PROFILE: {user_id}\n",
+        f"{'=' * 100}\n\n",
+        f"URL: {profile.get('url', 'N/A')}\n",
+        f"Claimed answers: {profile.get('nb_answers_claimed', 'N/A')}\n",
+        f"Unique answers extracted: {len(unique_answers)}\n",
+        f"\n{'=' * 100}\n\n",
+    ]
+
+    for i, ans in enumerate(unique_answers, 1):
+        parts.append(
+            f"\n{'=' * 100}\n"
+            f"ANSWER #{i}\n"
+            f"{'=' * 100}\n"
+            f"\n❓ QUESTION:\n{ans['question']}\n"
+            f"\n💬 ANSWER:\n{ans['answer']}\n"
+        )
+
+    _write_txt(txt_file, parts)
 
     print(f"💾 Saved: {txt_file}")
 
@@ -249,7 +498,7 @@ def clean_ultimate_output(input_file, output_dir):
     print(f"Blocks split (multiple Q&As): {split_count}")
     print(f"After cleaning: {len(cleaned_answers)}")
     print(f"After deduplication: {len(unique_answers)}")
-    print(f"Extraction rate: {len(unique_answers)}/{data['profile'].get('nb_answers_claimed', 'N/A')}")
+    print(f"Extraction rate: {len(unique_answers)}/{profile.get('nb_answers_claimed', 'N/A')}")
 
     return result
 
@@ -261,9 +510,11 @@ def main():
     parser.add_argument('input_file', help='Path to ultimate JSON file')
     parser.add_argument('-o', '--output', default='./output_cleaned',
                        help='Output directory')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                       help='Number of cleaning worker processes (default: CPU count)')
     args = parser.parse_args()
 
-    clean_ultimate_output(args.input_file, args.output)
+    clean_ultimate_output(args.input_file, args.output, jobs=args.jobs)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,61 @@
+# cython: language_level=3
+"""
+Compiled hot loop for extract_answers_improved.
+
+Mirrors _pair_qa_py in scraper_ultimate.py; keep the two in sync. The
+win comes from C-level loop counters and indexing instead of interpreted
+bytecode — the str operations themselves are already C under the hood.
+"""
+
+
+def pair_qa(list texts):
+    """
+    Pair question blocks with their answer blocks.
+
+    Args:
+        texts: Flat list of substantial text blocks in page order.
+
+    Returns:
+        List of (question, answer) tuples.
+    """
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t j
+    cdef Py_ssize_t n = len(texts)
+
+    pairs = []
+
+    while i < n - 1:
+        text = texts[i]
+
+        # Check if this looks like a question
+        if '?' in text:
+            # Next few elements might be date, credential, answer
+            j = i + 1
+
+            # Skip metadata (dates, credentials)
+            while j < n:
+                potential = texts[j]
+
+                # Skip short metadata
+                if len(potential) < 30:
+                    j += 1
+                    continue
+
+                # Skip if it looks like another question
+                if '?' in potential[-20:]:
+                    break
+
+                # This looks like an answer
+                if len(potential) > 50:
+                    # Not ending with "(more)" means not still truncated
+                    if not potential.endswith('...') and '(more)' not in potential[-20:]:
+                        pairs.append((text, potential))
+                    break
+
+                j += 1
+
+            i = j
+
+        i += 1
+
+    return pairs
@@ -6,6 +6,7 @@ Enfoque: Expandir botones (more) de manera más efectiva y extraer contenido com
 import time
 import json
 import logging
+import os
 import argparse
 import re
 from pathlib import Path
@@ -13,10 +14,51 @@ from datetime import datetime
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import NoSuchElementException, TimeoutException, ElementClickInterceptedException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+
+# Optional fast JSON codec: orjson encodes in C, several times faster
+# than the stdlib pretty-printer on large answer payloads.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Profile stat counters, all matched in one pass over the page text via
+# a named alternation instead of one re.search per field
+_PROFILE_STATS_RE = re.compile(
+    r'(?P<answers>\d+)\s+Answers'
+    r'|(?P<questions>\d+)\s+Questions'
+    r'|(?P<followers>\d+)\s+Followers'
+    r'|(?P<following>\d+)\s+Following'
+)
+
+# BeautifulSoup tree builder: lxml parses in C and is several times
+# faster than html.parser on multi-MB profile pages.
+try:
+    import lxml  # noqa: F401
+    _BS_PARSER = 'lxml'
+except ImportError:
+    _BS_PARSER = 'html.parser'
+
+# Optional array backend for the pairing scan: precomputes the
+# per-block length/flag tests as numpy arrays so the inner metadata
+# walk becomes a binary search instead of interpreted bytecode.
+try:
+    import numpy as _np
+except ImportError:
+    _np = None
+
+# Optional compiled pairing loop: _extract.pyx mirrors _pair_qa_py with
+# C-level loop counters, built on demand through pyximport when Cython
+# is installed. Falls back to the pure-Python scan otherwise.
+try:
+    import pyximport
+    pyximport.install(language_level=3)
+    from quora_scraper import _extract as _extract_c
+except Exception:
+    _extract_c = None
 
 logging.basicConfig(
     level=logging.INFO,
@@ -25,6 +67,57 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _write_txt(path, parts):
+    """
+    Flush a list of text chunks to path in one scatter-gather syscall
+    (os.writev) where the platform has it, instead of copying the
+    chunks through a joined string and the stdio buffer. Falls back to
+    a plain buffered write elsewhere (e.g. Windows).
+    """
+    chunks = [part.encode('utf-8') for part in parts]
+
+    if hasattr(os, 'writev'):
+        fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            # writev caps the buffer count at IOV_MAX (typically 1024)
+            # and, like write, may flush fewer bytes than asked: advance
+            # by the returned count until every chunk is on disk
+            idx = 0       # next chunk to flush
+            offset = 0    # bytes of chunks[idx] already flushed
+            while idx < len(chunks):
+                batch = chunks[idx:idx + 1024]
+                if offset:
+                    batch[0] = batch[0][offset:]
+                written = os.writev(fd, batch)
+                if written <= 0:
+                    raise OSError(f'writev returned {written} writing {path}')
+                written += offset
+                while idx < len(chunks) and written >= len(chunks[idx]):
+                    written -= len(chunks[idx])
+                    idx += 1
+                offset = written
+        finally:
+            os.close(fd)
+    else:
+        with open(path, 'wb') as f:
+            f.writelines(chunks)
+
+
+def _profile_stats(body_text):
+    """
+    Collect the profile counters (answers, questions, followers,
+    following) in a single scan of the page text.
+
+    Returns:
+        Dict mapping counter name to its first matched value.
+    """
+    stats = {}
+    for m in _PROFILE_STATS_RE.finditer(body_text):
+        # Keep the first occurrence of each field, like re.search would
+        stats.setdefault(m.lastgroup, m.group(m.lastgroup))
+    return stats
+
+
 def setup_driver():
     """Initialize Chrome WebDriver with stealth settings."""
     options = Options()
@@ -59,25 +152,57 @@ def wait_for_cloudflare(driver, max_wait=45):
     return False
 
 
-def scroll_and_load_all(driver, max_scrolls=200):
-    """Scroll to load all content with progress tracking."""
+# Installed once per page by scroll_and_load_all: counts DOM mutations
+# so the scroll loop can tell "still loading" from "nothing happening"
+# without sleeping a fixed interval
+_MUTATION_OBSERVER_JS = """
+if (window.__qs_mutations === undefined) {
+    window.__qs_mutations = 0;
+    new MutationObserver(function (muts) {
+        window.__qs_mutations += muts.length;
+    }).observe(document.body, {childList: true, subtree: true});
+}
+"""
+
+_MEASURE_JS = "return [document.body.scrollHeight, window.__qs_mutations || 0];"
+
+
+def scroll_and_load_all(driver, max_scrolls=200, poll_interval=0.2, max_wait=2.0):
+    """
+    Scroll to load all content with progress tracking.
+
+    Instead of an unconditional 2 s sleep per scroll, each iteration
+    polls scrollHeight plus a MutationObserver counter every
+    poll_interval seconds and moves on as soon as new content shows up
+    (or max_wait expires on an idle page).
+    """
     logger.info("📜 Scrolling to load all content...")
-    last_height = driver.execute_script("return document.body.scrollHeight")
+    driver.execute_script(_MUTATION_OBSERVER_JS)
+
+    last_height, last_mutations = driver.execute_script(_MEASURE_JS)
     no_change_count = 0
     scroll_count = 0
 
     while no_change_count < 5 and scroll_count < max_scrolls:
         # Scroll to bottom
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(2)
+
+        # Poll until the page grows or mutates, at poll_interval granularity
+        waited = 0.0
+        new_height, new_mutations = driver.execute_script(_MEASURE_JS)
+        while (new_height == last_height and new_mutations == last_mutations
+                and waited < max_wait):
+            time.sleep(poll_interval)
+            waited += poll_interval
+            new_height, new_mutations = driver.execute_script(_MEASURE_JS)
 
         # Check if we loaded more content
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        if new_height == last_height:
+        if new_height == last_height and new_mutations == last_mutations:
             no_change_count += 1
         else:
             no_change_count = 0
             last_height = new_height
+            last_mutations = new_mutations
 
         scroll_count += 1
         if scroll_count % 20 == 0:
@@ -87,123 +212,161 @@ def scroll_and_load_all(driver, max_scrolls=200):
     return scroll_count
 
 
+# Injected by expand_truncated_answers_v2: find every element whose own
+# text nodes contain "(more)", in DOM order, and click its nearest
+# clickable ancestor — all inside the browser, no per-button round-trip.
+_EXPAND_MORE_JS = """
+var snapshot = document.evaluate(
+    "//*[text()[contains(., '(more)')]]",
+    document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var clicked = 0;
+for (var i = 0; i < snapshot.snapshotLength; i++) {
+    var el = snapshot.snapshotItem(i);
+    try {
+        el.scrollIntoView({block: 'center'});
+        var target = el.closest("a, button, [role='button']") || el.parentElement || el;
+        target.click();
+        clicked++;
+    } catch (err) {
+        // Keep going, some indicators are not clickable
+    }
+}
+return clicked;
+"""
+
+
 def expand_truncated_answers_v2(driver):
     """
     Improved version to expand truncated answers.
-    Uses multiple strategies to click (more) buttons.
+    One injected JS pass finds and clicks every (more) button inside
+    the browser, instead of a scrollIntoView + click round-trip (plus
+    sleep) per button from Python.
     """
     logger.info("🔍 Searching for truncated answers...")
 
-    # Strategy 1: Find all elements containing "(more)"
-    more_selectors = [
-        "//span[contains(text(), '(more)')]",
-        "//div[contains(text(), '(more)')]",
-        "//a[contains(text(), '(more)')]",
-        "//*[contains(text(), '(more)')]"
-    ]
-
-    all_more_buttons = []
-    for selector in more_selectors:
-        try:
-            buttons = driver.find_elements(By.XPATH, selector)
-            all_more_buttons.extend(buttons)
-        except:
-            pass
-
-    # Remove duplicates
-    unique_buttons = list(set(all_more_buttons))
-    logger.info(f"Found {len(unique_buttons)} '(more)' indicators")
-
-    expanded_count = 0
-    failed_count = 0
+    try:
+        expanded_count = driver.execute_script(_EXPAND_MORE_JS)
+    except Exception as e:
+        logger.warning(f"Expansion script failed: {e}")
+        expanded_count = 0
 
-    for i, button in enumerate(unique_buttons):
-        try:
-            # Get the parent clickable element
-            parent = button.find_element(By.XPATH, "..")
-
-            # Scroll into view
-            driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", parent)
-            time.sleep(0.3)
-
-            # Try multiple click methods
-            try:
-                # Method 1: Regular click
-                parent.click()
-                expanded_count += 1
-            except ElementClickInterceptedException:
-                try:
-                    # Method 2: JavaScript click
-                    driver.execute_script("arguments[0].click();", parent)
-                    expanded_count += 1
-                except:
-                    # Method 3: Click on the button itself
-                    try:
-                        driver.execute_script("arguments[0].click();", button)
-                        expanded_count += 1
-                    except:
-                        failed_count += 1
-
-            # Small delay between clicks
-            if i % 10 == 0 and i > 0:
-                logger.info(f"   Expanded {expanded_count}/{i} so far...")
-                time.sleep(0.5)
-
-        except Exception as e:
-            failed_count += 1
-            continue
+    logger.info(f"✅ Expansion complete: {expanded_count} expanded")
 
-    logger.info(f"✅ Expansion complete: {expanded_count} expanded, {failed_count} failed")
+    # Single settle delay for the expanded content to render
     time.sleep(2)
     return expanded_count
 
 
-def extract_answers_improved(driver):
+def _extract_structured(soup):
     """
-    Extract answers using improved parsing strategy.
-    Looks for answer blocks and extracts complete text.
+    Pull (question, answer) pairs straight from Quora's answer
+    containers ('q-relative spacing_log_answer_content', the same class
+    scraper.py keys on) instead of reconstructing them from flat text.
+
+    Returns an empty list when the containers are missing (markup
+    change), so the caller can fall back to the flat-text heuristic.
     """
-    logger.info("📊 Extracting answers from page...")
+    pairs = []
 
-    # Get page source and parse with BeautifulSoup
-    html = driver.page_source
-    soup = BeautifulSoup(html, 'html.parser')
+    for div in soup.find_all('div', {'class': 'q-relative spacing_log_answer_content'}):
+        answer = div.get_text(' ', strip=True)
+        if len(answer) < 30:
+            continue
 
-    answers = []
+        # The question link precedes its answer container; skip the
+        # "Answered ..."/"Updated ..." permalinks and short labels.
+        # Walk back one anchor at a time (find_all_previous would
+        # materialize every preceding <a> in the document for each
+        # container) and give up after a handful — the question link
+        # sits only a few anchors above its answer
+        question = ''
+        link = div
+        for _ in range(25):
+            link = link.find_previous('a', href=True)
+            if link is None:
+                break
+            text = link.get_text(strip=True)
+            if (len(text) > 20 and '?' in text
+                    and not text.startswith(('Answered', 'Updated'))):
+                question = text
+                break
+
+        if question:
+            pairs.append((question, answer))
+
+    return pairs
+
+
+def _pair_qa_np(all_text):
+    """
+    Pair question blocks with their answer blocks, numpy flavour.
+
+    Same result as _pair_qa_py (keep the two in sync): the per-block
+    tests are precomputed as arrays once, every "stopper" block (a
+    follow-up question or an answer-sized block) is indexed up front,
+    and each question finds its stopper with a binary search instead of
+    walking the metadata blocks one interpreted step at a time.
 
-    # Strategy: Find all answer containers
-    # Quora answers are typically in divs with specific structure
-    # Look for patterns like: question text followed by answer text
+    Returns:
+        List of (question, answer) tuples.
+    """
+    n = len(all_text)
+    lens = _np.fromiter((len(t) for t in all_text), dtype=_np.int64, count=n)
+    q_tail = _np.fromiter(('?' in t[-20:] for t in all_text), dtype=bool, count=n)
+    truncated = _np.fromiter(
+        (t.endswith('...') or '(more)' in t[-20:] for t in all_text),
+        dtype=bool, count=n)
+
+    # A scan past metadata stops at the first follow-up question
+    # (substantial block with '?' in the tail) or answer-sized block;
+    # only the latter kind yields a pair
+    is_q_stop = q_tail & (lens >= 30)
+    is_answer = (lens > 50) & ~q_tail
+    stop_idx = _np.nonzero(is_q_stop | is_answer)[0]
+
+    pairs = []
+    i = 0
+    while i < n - 1:
+        if '?' in all_text[i]:
+            k = int(_np.searchsorted(stop_idx, i + 1))
+            if k == len(stop_idx):
+                # Nothing but short metadata remains
+                break
+            j = int(stop_idx[k])
+            if is_answer[j] and not truncated[j]:
+                pairs.append((all_text[i], all_text[j]))
+            i = j
+        i += 1
+
+    return pairs
 
-    # Find all text blocks
-    text_blocks = soup.find_all(['div', 'span'], class_=True)
 
-    # Build a list of all text elements with their hierarchy
-    all_text = []
-    for elem in text_blocks:
-        text = elem.get_text(strip=True)
-        if len(text) > 20:  # Only consider substantial text
-            all_text.append(text)
+def _pair_qa_py(all_text):
+    """
+    Pair question blocks with their answer blocks.
 
-    logger.info(f"Found {len(all_text)} text blocks")
+    Pure-Python fallback for _extract.pyx and _pair_qa_np (keep the
+    three in sync).
+    Questions contain "?"; the following blocks are scanned past short
+    metadata (dates, credentials) until an answer-sized block shows up.
 
-    # Pattern matching: Look for Q&A pairs
-    # Questions usually end with "?" or are followed by date/credential info
-    question_pattern = re.compile(r'.{20,}[?]')
+    Returns:
+        List of (question, answer) tuples.
+    """
+    pairs = []
+    n = len(all_text)
 
     i = 0
-    while i < len(all_text) - 1:
+    while i < n - 1:
         text = all_text[i]
 
         # Check if this looks like a question
-        if question_pattern.match(text) or '?' in text:
-            question = text
-
+        if '?' in text:
             # Next few elements might be date, credential, answer
             potential_answer_idx = i + 1
 
             # Skip metadata (dates, credentials)
-            while potential_answer_idx < len(all_text):
+            while potential_answer_idx < n:
                 potential = all_text[potential_answer_idx]
 
                 # Skip short metadata
@@ -218,13 +381,8 @@ def extract_answers_improved(driver):
                 # This looks like an answer
                 if len(potential) > 50:
                     # Check that it's not ending with "(more)" which means still truncated
-                    if not potential.endswith('...') and not '(more)' in potential[-20:]:
-                        answers.append({
-                            'question': question,
-                            'answer': potential,
-                            'extracted_at': datetime.now().isoformat()
-                        })
-                        logger.info(f"   ✓ Extracted answer {len(answers)}")
+                    if not potential.endswith('...') and '(more)' not in potential[-20:]:
+                        pairs.append((text, potential))
                     break
 
                 potential_answer_idx += 1
@@ -233,6 +391,66 @@ def extract_answers_improved(driver):
 
         i += 1
 
+    return pairs
+
+
+def extract_answers_improved(html):
+    """
+    Extract answers using improved parsing strategy.
+    Looks for answer blocks and extracts complete text.
+
+    Args:
+        html: Page source to parse (the caller decides when to snapshot
+              it, so no extra round-trip to the browser happens here).
+    """
+    logger.info("📊 Extracting answers from page...")
+
+    # Parse with BeautifulSoup
+    soup = BeautifulSoup(html, _BS_PARSER)
+
+    answers = []
+
+    # Strategy 1: Walk the known answer containers directly — a few
+    # hundred nodes instead of every classed div/span on the page
+    pairs = _extract_structured(soup)
+
+    if pairs:
+        logger.info(f"Found {len(pairs)} answer containers")
+    else:
+        # Markup changed: fall back to pairing flat text blocks
+        # Find all text blocks
+        text_blocks = soup.find_all(['div', 'span'], class_=True)
+
+        # Build a list of all text elements with their hierarchy.
+        # Wrapper chains repeat the same text at every nesting level, so
+        # drop blocks whose exact text has already been collected.
+        all_text = []
+        seen_text = set()
+        for elem in text_blocks:
+            text = elem.get_text(strip=True)
+            if len(text) > 20 and text not in seen_text:  # Only consider substantial text
+                seen_text.add(text)
+                all_text.append(text)
+
+        logger.info(f"Found {len(all_text)} text blocks")
+
+        # Pattern matching: Look for Q&A pairs
+        # Questions contain "?" and are followed by date/credential info
+        if _extract_c is not None:
+            pairs = _extract_c.pair_qa(all_text)
+        elif _np is not None:
+            pairs = _pair_qa_np(all_text)
+        else:
+            pairs = _pair_qa_py(all_text)
+
+    for question, answer in pairs:
+        answers.append({
+            'question': question,
+            'answer': answer,
+            'extracted_at': datetime.now().isoformat()
+        })
+        logger.info(f"   ✓ Extracted answer {len(answers)}")
+
     logger.info(f"✅ Total answers extracted: {len(answers)}")
     return answers
 
@@ -260,10 +478,11 @@ def scrape_profile_ultimate(user_id, output_dir):
 
         time.sleep(3)
 
-        # Get profile stats
-        body_text = driver.find_element(By.TAG_NAME, "body").text
-        nb_answers = re.search(r'(\d+)\s+Answers', body_text)
-        nb_answers = nb_answers.group(1) if nb_answers else "0"
+        # Get profile stats from the HTML already held by the driver —
+        # body.text would make Chrome serialize the whole rendered text
+        # a second time just for one counter
+        body_text = BeautifulSoup(driver.page_source, _BS_PARSER).get_text(' ')
+        nb_answers = _profile_stats(body_text).get('answers', "0")
 
         logger.info(f"📊 Profile has {nb_answers} answers")
 
@@ -273,8 +492,9 @@ def scrape_profile_ultimate(user_id, output_dir):
         # Expand truncated answers
         expanded = expand_truncated_answers_v2(driver)
 
-        # Extract answers
-        answers = extract_answers_improved(driver)
+        # Extract answers from a fresh snapshot (scrolling and the
+        # expansion clicks changed the DOM since the stats read)
+        answers = extract_answers_improved(driver.page_source)
 
         # Save results
         result = {
@@ -294,27 +514,38 @@ def scrape_profile_ultimate(user_id, output_dir):
 
         # Save JSON
         json_file = output_path / f"{user_id}_ultimate.json"
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
+        if orjson is not None:
+            # orjson emits UTF-8 bytes and never escapes non-ASCII, so
+            # the on-disk format matches ensure_ascii=False output
+            with open(json_file, 'wb') as f:
+                f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2))
+        else:
+            with open(json_file, 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=2, ensure_ascii=False)
         logger.info(f"💾 JSON: {json_file}")
 
-        # Save TXT
+        # Save TXT (assemble chunks in memory, flush in one go)
         txt_file = output_path / f"{user_id}_ultimate.txt"
-        with open(txt_file, 'w', encoding='utf-8') as f:
-            f.write(f"QUORA PROFILE: {user_id}\n")
-            f.write(f"{'=' * 100}\n\n")
-            f.write(f"URL: {url}\n")
-            f.write(f"Claimed answers: {nb_answers}\n")
-            f.write(f"Extracted answers: {len(answers)}\n")
-            f.write(f"Extraction rate: {len(answers)}/{nb_answers}\n")
-            f.write(f"\n{'=' * 100}\n\n")
-
-            for i, ans in enumerate(answers, 1):
-                f.write(f"\n{'=' * 100}\n")
-                f.write(f"ANSWER #{i}\n")
-                f.write(f"{'=' * 100}\n")
-                f.write(f"\n❓ QUESTION:\n{ans['question']}\n")
-                f.write(f"\n💬 ANSWER:\n{ans['answer']}\n")
+        parts = [
+            f"QUORA PROFILE: {user_id}\n",
+            f"{'=' * 100}\n\n",
+            f"URL: {url}\n",
+            f"Claimed answers: {nb_answers}\n",
+            f"Extracted answers: {len(answers)}\n",
+            f"Extraction rate: {len(answers)}/{nb_answers}\n",
+            f"\n{'=' * 100}\n\n",
+        ]
+
+        for i, ans in enumerate(answers, 1):
+            parts.append(
+                f"\n{'=' * 100}\n"
+                f"ANSWER #{i}\n"
+                f"{'=' * 100}\n"
+                f"\n❓ QUESTION:\n{ans['question']}\n"
+                f"\n💬 ANSWER:\n{ans['answer']}\n"
+            )
+
+        _write_txt(txt_file, parts)
 
         logger.info(f"💾 TXT: {txt_file}")
 